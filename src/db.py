@@ -1,12 +1,18 @@
+import gzip
 from pathlib import Path
+from typing import Sequence
+
 from pandas import DataFrame
 from sqlalchemy import (
     Column,
+    Index,
     Integer,
+    LargeBinary,
     MetaData,
     String,
     Table,
     create_engine,
+    event,
     Engine,
 )
 
@@ -16,14 +22,24 @@ class DB:
         self.engine: Engine = create_engine(f"sqlite:///{fp}")
         self.metadata: MetaData = MetaData()
 
+        @event.listens_for(self.engine, "connect")
+        def _set_pragmas(dbapi_conn, _) -> None:
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA cache_size=-65536")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
     def create_tables(self) -> None:
         Table(
             "front_matter",
             self.metadata,
             Column("id", Integer, primary_key=True, autoincrement=True),
             Column("url", String, nullable=False),
-            Column("html", String, nullable=False),
+            Column("html", LargeBinary, nullable=False),
             Column("page", Integer, nullable=False),
+            Index("ix_front_matter_url", "url", unique=True),
         )
 
         Table(
@@ -35,15 +51,78 @@ class DB:
             Column("publication_date", String, nullable=True),
             Column("authors", String, nullable=True),
             Column("status", String, nullable=True),
+            Index("ix_metadata_url", "url"),
         )
 
         self.metadata.create_all(bind=self.engine, checkfirst=True)
 
-    def df2table(self, df: DataFrame, table: str) -> None:
-        df.to_sql(
-            name=table,
-            con=self.engine,
-            if_exists="append",
-            index=False,
+        # create_all skips indexes of tables that already exist
+        for table in self.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self.engine, checkfirst=True)
+
+        self._compress_legacy_html()
+
+    def _compress_legacy_html(self) -> None:
+        # Databases written before pages were gzip-compressed hold plain-text HTML
+        with self.engine.begin() as conn:
+            rows = conn.exec_driver_sql(
+                "SELECT id, html FROM front_matter WHERE typeof(html) = 'text'"
+            ).fetchall()
+            if not rows:
+                return
+
+            conn.exec_driver_sql(
+                "UPDATE front_matter SET html = ? WHERE id = ?",
+                [(gzip.compress(html.encode("utf-8"), compresslevel=1), id_) for id_, html in rows],
+            )
+
+    def insert_rows(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Sequence[tuple],
+        upsert_key: str | None = None,
+    ) -> None:
+        # With upsert_key, rows whose key already exists overwrite the stored columns
+        if not rows:
+            return
+
+        placeholders: str = ", ".join(["?"] * len(columns))
+        sql: str = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        if upsert_key is not None:
+            updates: str = ", ".join(f"{column} = excluded.{column}" for column in columns if column != upsert_key)
+            sql += f" ON CONFLICT({upsert_key}) DO UPDATE SET {updates}"
+
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(sql, list(rows))
+
+    def df2table(self, df: DataFrame, table: str, upsert_key: str | None = None) -> None:
+        if df.empty:
+            return
+
+        self.insert_rows(
+            table=table,
+            columns=list(df.columns),
+            rows=list(df.itertuples(index=False, name=None)),
+            upsert_key=upsert_key,
         )
 
+    def urls(self, table: str) -> set[str]:
+        with self.engine.connect() as conn:
+            return {row[0] for row in conn.exec_driver_sql(f"SELECT url FROM {table}")}
+
+    def read_pages(self, urls: Sequence[str], batch_size: int = 500) -> DataFrame:
+        rows: list[tuple] = []
+
+        with self.engine.connect() as conn:
+            for start in range(0, len(urls), batch_size):
+                batch = urls[start:start + batch_size]
+                placeholders: str = ", ".join(["?"] * len(batch))
+                result = conn.exec_driver_sql(
+                    f"SELECT url, html FROM front_matter WHERE url IN ({placeholders})",
+                    tuple(batch),
+                )
+                rows.extend(tuple(row) for row in result)
+
+        return DataFrame.from_records(rows, columns=["url", "html"])
@@ -1,12 +1,20 @@
+import asyncio
+import gzip
+import os
+import re
 import requests
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborCSSSelector, LexborHTMLParser, LexborNode
+from html import unescape
 from pathlib import Path
 from typing import Any, List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import click
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pandas import DataFrame
-from progress.bar import Bar
+from tqdm import tqdm
 
 from src.db import DB
 
@@ -16,145 +24,340 @@ HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
 }
 
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=3, backoff_factor=0.3))
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# (url, gzip-compressed HTML bytes, listing page); html is None when the fetch failed
+FetchResult = Tuple[str, bytes | None, int]
+PageRow = Tuple[str, bytes, int]
+
+_TITLE_MARKER = b'<meta name="citation_title" content="'
+_AUTHOR_MARKER = b'<meta name="citation_author" content="'
+_DATE_MARKER = b'<meta name="citation_publication_date" content="'
+
+_HREF_RE = re.compile(rb'<a href="(https://jose\.theoj\.org/papers/[^"#?]+)"')
+
+# One selector engine per process, shared by every parsed document
+_SELECTOR = LexborCSSSelector()
+_SEL_TITLE = 'meta[name="citation_title"]'
+_SEL_PAPER_TITLE = "h2.paper-title"
+_SEL_HTML_TITLE = "title"
+_SEL_AUTHORS = 'meta[name="citation_author"]'
+_SEL_SUBMITTED_BY = "div.submitted_by"
+_SEL_DATE = 'meta[name="citation_publication_date"]'
+_SEL_TIME = "span.time"
+_SEL_BADGES = "span.badge"
+_SEL_METADATA = ", ".join((
+    _SEL_TITLE,
+    _SEL_PAPER_TITLE,
+    _SEL_HTML_TITLE,
+    _SEL_AUTHORS,
+    _SEL_SUBMITTED_BY,
+    _SEL_DATE,
+    _SEL_TIME,
+    _SEL_BADGES,
+))
+_META_SELECTORS = {
+    "citation_title": _SEL_TITLE,
+    "citation_author": _SEL_AUTHORS,
+    "citation_publication_date": _SEL_DATE,
+}
+_CLASS_SELECTORS = {
+    ("h2", "paper-title"): _SEL_PAPER_TITLE,
+    ("div", "submitted_by"): _SEL_SUBMITTED_BY,
+    ("span", "time"): _SEL_TIME,
+    ("span", "badge"): _SEL_BADGES,
+}
+
+
+def _css(node: LexborNode, query: str) -> List[LexborNode]:
+    return _SELECTOR.find(query, node)
+
+
+def _select_metadata(tree: LexborHTMLParser) -> dict[str, List[LexborNode]]:
+    # Run the grouped metadata selector once and bucket matches under every selector they satisfy
+    nodes: dict[str, List[LexborNode]] = {}
+    for node in _css(tree.root, _SEL_METADATA):
+        if node.tag == "meta":
+            keys = [_META_SELECTORS[node.attributes["name"]]]
+        elif node.tag == "title":
+            keys = [_SEL_HTML_TITLE]
+        else:
+            classes = (node.attributes.get("class") or "").split()
+            keys = [_CLASS_SELECTORS[(node.tag, c)] for c in dict.fromkeys(classes) if (node.tag, c) in _CLASS_SELECTORS]
+
+        for key in keys:
+            nodes.setdefault(key, []).append(node)
+    return nodes
+
+
+def _first(nodes: dict[str, List[LexborNode]], selector: str) -> LexborNode | None:
+    matches = nodes.get(selector)
+    return matches[0] if matches else None
+
+
+def _slice_badges(html: bytes, start: int = 0) -> bytes | None:
+    # Every span.badge carries "badge" in its start tag, so it sits between the first and last mention
+    first = html.find(b"badge", start)
+    if first < 0:
+        return None
+
+    begin = max(html.rfind(b"<", start, first), start)
+    end = html.find(b"</span>", html.rfind(b"badge"))
+    return html[begin:end + 7 if end >= 0 else len(html)]
+
+
+def _slice_metadata_region(html: bytes) -> bytes | None:
+    # The citation metas live in <head>; only the status badges are needed from <body>
+    head_end = html.find(b"</head>")
+    if head_end < 0:
+        return None
+
+    region = html[:head_end + 7]
+    badges = _slice_badges(html, head_end + 7)
+    if badges is not None:
+        region += badges
+    return region
+
+
+def _has_citation_metadata(nodes: dict[str, List[LexborNode]]) -> bool:
+    title_tag = _first(nodes, _SEL_TITLE)
+    date_tag = _first(nodes, _SEL_DATE)
+    return bool(
+        title_tag
+        and title_tag.attributes.get("content")
+        and nodes.get(_SEL_AUTHORS)
+        and date_tag
+        and date_tag.attributes.get("content") is not None
+    )
+
 
 def download_listing_pages(total_pages: int = 12) -> DataFrame:
-    data = {"url": [], "html": [], "page": []}
+    rows: List[PageRow] = []
     print("⚡ Downloading listing pages from JOSE...")
 
-    for page in range(1, total_pages + 1):
+    def fetch(page: int) -> FetchResult:
         url = ARTICLES_URL_TEMPLATE.format(page)
         print(f"📄 Fetching listing page {page}: {url}")
         try:
-            response = requests.get(url, headers=HEADERS, timeout=30)
+            response = SESSION.get(url, timeout=30)
             if response.status_code == 200:
-                data["url"].append(url)
-                data["html"].append(response.text)
-                data["page"].append(page)
+                return url, gzip.compress(response.content, compresslevel=1), page
+            else:
+                return url, None, page
         except Exception as e:
             print(f"[ERROR] Failed to fetch page {page}: {e}")
+            return url, None, page
 
-    print(f"✅ Downloaded {len(data['url'])} listing pages successfully.")
-    return DataFrame(data)
+    with ThreadPoolExecutor(max_workers=max(1, total_pages)) as executor:
+        # map yields results in page order, keeping listing rows and article order stable across runs
+        for url, html, page in executor.map(fetch, range(1, total_pages + 1)):
+            if html:
+                rows.append((url, html, page))
 
+    print(f"✅ Downloaded {len(rows)} listing pages successfully.")
+    return DataFrame.from_records(rows, columns=["url", "html", "page"])
 
-def get_all_article_urls() -> List[Tuple[str, int]]:
-    print("🔎 Scraping article URLs from JOSE...")
-    all_urls: List[Tuple[str, int]] = []
 
-    for page in range(1, 13):
-        url = ARTICLES_URL_TEMPLATE.format(page)
-        response = requests.get(url, headers=HEADERS, timeout=60)
-        if response.status_code != 200:
-            print(f"[WARN] Failed to load page {page}")
-            continue
-
-        soup = BeautifulSoup(response.content, "lxml")
-        cards = soup.find_all("div", class_="paper-card")
+def get_all_article_urls(listing_pages_df: DataFrame) -> List[Tuple[str, int]]:
+    print("🔎 Scraping article URLs from JOSE listing pages...")
+    all_urls: List[Tuple[str, int]] = []
 
-        page_urls = [
-            (card.find("a")["href"], page)
-            for card in cards
-            if card.find("a") and card.find("a")["href"].startswith("https://jose.theoj.org/papers/")
-        ]
+    for html, page in listing_pages_df[["html", "page"]].itertuples(index=False, name=None):
+        matches = _HREF_RE.findall(gzip.decompress(html))
+        page_urls = list(dict.fromkeys((href.decode(), page) for href in matches))
 
         all_urls.extend(page_urls)
         print(f"✅ Found {len(page_urls)} articles on page {page}")
 
-    unique_urls = list(set(all_urls))
+    unique_urls = list(dict.fromkeys(all_urls))
     print(f"✅ Total unique articles found: {len(unique_urls)}")
     return unique_urls
 
 
-def download_article_pages(urls_with_pages: List[Tuple[str, int]]) -> DataFrame:
-    data = {"url": [], "html": [], "page": []}
-    print("⚡ Downloading HTML front matter of JOSE articles...")
-
-    def fetch(index: int, url: str, page: int) -> Tuple[str, bytes | None, int]:
-        try:
-            print(f"📄 Fetching {index + 1}/{len(urls_with_pages)}: {url}")
-            response = requests.get(url, headers=HEADERS, timeout=30)
-            if response.status_code == 200:
-                return url, response.content, page
-            else:
-                return url, None, page
-        except Exception as e:
-            print(f"[ERROR] Failed to fetch {url}: {e}")
+async def fetch_article(client: httpx.AsyncClient, url: str, page: int) -> FetchResult:
+    try:
+        response = await client.get(url, timeout=30)
+        if response.status_code == 200:
+            return url, gzip.compress(response.content, compresslevel=1), page
+        else:
             return url, None, page
-
-    with ThreadPoolExecutor(max_workers=20) as executor:
-        futures = [executor.submit(fetch, i, url, page) for i, (url, page) in enumerate(urls_with_pages)]
-        for future in as_completed(futures):
-            url, content, page = future.result()
+    except Exception as e:
+        print(f"[ERROR] Failed to fetch {url}: {e}")
+        return url, None, page
+
+
+async def _download_article_pages(urls_with_pages: List[Tuple[str, int]], db: DB, batch_size: int) -> int:
+    columns = ("url", "html", "page")
+    queue: List[PageRow] = []
+    downloaded = 0
+
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        retries=3,
+    )
+    async with httpx.AsyncClient(transport=transport, headers=HEADERS, follow_redirects=True) as client:
+        tasks = [fetch_article(client, url, page) for url, page in urls_with_pages]
+        for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Downloading articles"):
+            url, content, page = await task
             if content:
-                data["url"].append(url)
-                data["html"].append(content)
-                data["page"].append(page)
+                queue.append((url, content, page))
+                downloaded += 1
 
-    print(f"✅ Downloaded {len(data['url'])} articles successfully.")
-    return DataFrame(data)
+            if len(queue) >= batch_size:
+                db.insert_rows(table="front_matter", columns=columns, rows=queue, upsert_key="url")
+                queue.clear()
+
+    db.insert_rows(table="front_matter", columns=columns, rows=queue, upsert_key="url")
+    return downloaded
+
+
+def download_article_pages(urls_with_pages: List[Tuple[str, int]], db: DB, batch_size: int = 100) -> int:
+    print("⚡ Downloading HTML front matter of JOSE articles...")
+
+    ingested = db.urls(table="front_matter")
+    pending = [(url, page) for url, page in urls_with_pages if url not in ingested]
+    print(f"⏭️ Skipping {len(urls_with_pages) - len(pending)} articles already in the database")
+
+    downloaded = asyncio.run(_download_article_pages(pending, db, batch_size))
+    print(f"✅ Downloaded {downloaded} articles successfully.")
+    return downloaded
+
+
+def _scan_attribute(html: bytes, marker: bytes, start: int = 0) -> Tuple[str | None, int]:
+    begin = html.find(marker, start)
+    if begin < 0:
+        return None, -1
+
+    begin += len(marker)
+    end = html.find(b'"', begin)
+    if end < 0:
+        return None, -1
+    return unescape(html[begin:end].decode("utf-8", errors="replace")), end
+
+
+def extract_fast(html: bytes) -> dict[str, str] | None:
+    # JOSE paper pages share one layout, so the citation metas can be sliced straight out of the bytes.
+    # Returns None when a marker is missing and the page needs the full parser; status is left to the parser.
+    title, _ = _scan_attribute(html, _TITLE_MARKER)
+    pub_date, _ = _scan_attribute(html, _DATE_MARKER)
+    if not title or pub_date is None:
+        return None
+
+    authors: List[str] = []
+    author, end = _scan_attribute(html, _AUTHOR_MARKER)
+    while author is not None:
+        if author:
+            authors.append(author.strip())
+        author, end = _scan_attribute(html, _AUTHOR_MARKER, end)
+    if not authors:
+        return None
+
+    return {
+        "title": title.strip(),
+        "publication_date": pub_date.strip(),
+        "authors": "; ".join(authors),
+    }
+
+
+def _status(badge_tags: List[LexborNode]) -> str:
+    for tag in badge_tags:
+        if "badge-lang" not in (tag.attributes.get("class") or "").split():
+            return tag.text().strip().lower()
+    return ""
+
+
+def _badge_status(html: bytes) -> str:
+    head_end = html.find(b"</head>")
+    badges = _slice_badges(html, head_end + 7 if head_end >= 0 else 0)
+    if badges is None:
+        return ""
+
+    tree = LexborHTMLParser(badges)
+    return _status(_css(tree.root, _SEL_BADGES))
+
+
+def parse_html(html: bytes) -> dict[str, str]:
+    region = _slice_metadata_region(html)
+    tree = LexborHTMLParser(region if region is not None else html)
+
+    nodes = _select_metadata(tree)
+    if region is not None and not _has_citation_metadata(nodes):
+        # Fallback fields (paper title, submitter, time) are in <body>
+        tree = LexborHTMLParser(html)
+        nodes = _select_metadata(tree)
+
+    # Title
+    title_tag = _first(nodes, _SEL_TITLE)
+
+    if title_tag and title_tag.attributes.get("content"):
+        title = title_tag.attributes["content"].strip()
+    else:
+        h2_title = _first(nodes, _SEL_PAPER_TITLE)
+        if h2_title and h2_title.text().strip():
+            title = h2_title.text().strip()
+        else:
+            html_title = _first(nodes, _SEL_HTML_TITLE)
+            title = html_title.text().strip().split("·")[0] if html_title else ""
+
+    # Authors
+    author_tags = nodes.get(_SEL_AUTHORS, [])
+    if not author_tags:
+        submitted_by = _first(nodes, _SEL_SUBMITTED_BY)
+        author = submitted_by.text().strip() if submitted_by else ""
+        authors = author
+    else:
+        authors = "; ".join(
+            tag.attributes["content"].strip() for tag in author_tags if tag.attributes.get("content")
+        )
+
+    # Publication date
+    pub_date_tag = _first(nodes, _SEL_DATE)
+    if not pub_date_tag or pub_date_tag.attributes.get("content") is None:
+        time_tag = _first(nodes, _SEL_TIME)
+        pub_date = time_tag.text().strip() if time_tag else ""
+    else:
+        pub_date = pub_date_tag.attributes["content"].strip()
+
+    return {
+        "title": title,
+        "publication_date": pub_date,
+        "authors": authors,
+        "status": _status(nodes.get(_SEL_BADGES, [])),
+    }
+
+
+def parse_one(html: bytes, url: str) -> dict[str, Any] | None:
+    try:
+        document = gzip.decompress(html)
+        metadata = extract_fast(document)
+        if metadata is None:
+            metadata = parse_html(document)
+        else:
+            metadata["status"] = _badge_status(document)
+
+        return {"url": url, **metadata}
+
+    except Exception as e:
+        print(f"[ERROR] Failed to parse {url}: {e}")
+        return None
 
 
 def extract_metadata(df: DataFrame) -> DataFrame:
     data: List[dict[str, Any]] = []
 
-    with Bar("Extracting paper metadata from HTML...", max=df.shape[0]) as bar:
-        for idx, row in df.iterrows():
-            soup = BeautifulSoup(row["html"], "lxml")
-
-            try:
-                # Title
-                title_tag = soup.find("meta", attrs={"name": "citation_title"})
-                
-                if title_tag and title_tag.get("content"):
-                    title = title_tag["content"].strip()
-                else:
-                    h2_title = soup.find("h2", class_="paper-title")
-                    if h2_title and h2_title.text.strip():
-                        title = h2_title.text.strip()
-                    else:
-                        html_title = soup.find("title")
-                        title = html_title.text.strip().split("·")[0] if html_title else ""
-
-                # Authors
-                author_tags = soup.find_all("meta", attrs={"name": "citation_author"})
-                if not author_tags:
-                    submitted_by = soup.find("div", class_="submitted_by")
-                    author = submitted_by.text.strip() if submitted_by else ""
-                    authors = author
-                else:
-                    authors = "; ".join(tag["content"].strip() for tag in author_tags if tag.get("content"))
-
-                # Publication date
-                pub_date_tag = soup.find("meta", attrs={"name": "citation_publication_date"})
-                if not pub_date_tag:
-                    time_tag = soup.find("span", class_="time")
-                    pub_date = time_tag.text.strip() if time_tag else ""
-                else:
-                    pub_date = pub_date_tag["content"].strip()
-
-                # Status
-                badge_tags = soup.find_all("span", class_="badge")
-                status = ""
-                for tag in badge_tags:
-                    if "badge-lang" not in tag.get("class", []):
-                        status = tag.text.strip().lower()
-                        break
-
-                data.append({
-                    "url": row["url"],
-                    "title": title,
-                    "publication_date": pub_date,
-                    "authors": authors,
-                    "status": status,
-                })
-
-            except Exception as e:
-                print(f"[ERROR] Failed to parse {row['url']}: {e}")
-
-            bar.next()
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(parse_one, df["html"].tolist(), df["url"].tolist(), chunksize=16)
+        for result in tqdm(results, total=len(df), desc="Extracting paper metadata from HTML"):
+            if result is not None:
+                data.append(result)
 
     print(f"✅ Extracted metadata for {len(data)} articles")
-    return DataFrame(data)
+    return DataFrame.from_records(data, columns=["url", "title", "publication_date", "authors", "status"])
 
 
 @click.command()
@@ -176,10 +379,14 @@ def main(outputFP: Path) -> None:
     db.create_tables()
 
     listing_pages_df = download_listing_pages()
-    db.df2table(df=listing_pages_df, table="front_matter")
+    db.df2table(df=listing_pages_df, table="front_matter", upsert_key="url")
+
+    article_urls = get_all_article_urls(listing_pages_df)
+    download_article_pages(article_urls, db)
 
-    article_urls = get_all_article_urls()
-    article_pages_df = download_article_pages(article_urls)
+    extracted = db.urls(table="metadata")
+    pending_urls = [url for url, _ in article_urls if url not in extracted]
+    article_pages_df = db.read_pages(urls=pending_urls)
     metadf = extract_metadata(article_pages_df)
     db.df2table(df=metadf, table="metadata")
 
@@ -0,0 +1,44 @@
+import gzip
+import sqlite3
+from pathlib import Path
+
+from src.db import DB
+
+
+def _db(tmp_path: Path) -> DB:
+    db = DB(fp=tmp_path / "jose.db")
+    db.create_tables()
+    return db
+
+
+def test_reinserted_listing_page_overwrites_stored_row(tmp_path: Path) -> None:
+    db = _db(tmp_path)
+    url = "https://jose.theoj.org/papers?page=1"
+    columns = ("url", "html", "page")
+
+    db.insert_rows(table="front_matter", columns=columns, rows=[(url, b"old", 1)], upsert_key="url")
+    db.insert_rows(table="front_matter", columns=columns, rows=[(url, b"new", 2)], upsert_key="url")
+
+    rows = sqlite3.connect(tmp_path / "jose.db").execute("SELECT url, html, page FROM front_matter").fetchall()
+    assert rows == [(url, b"new", 2)]
+
+
+def test_create_tables_compresses_legacy_text_html_once(tmp_path: Path) -> None:
+    fp = tmp_path / "jose.db"
+    legacy = sqlite3.connect(fp)
+    legacy.execute(
+        "CREATE TABLE front_matter (id INTEGER NOT NULL, url VARCHAR NOT NULL, "
+        "html VARCHAR NOT NULL, page INTEGER NOT NULL, PRIMARY KEY (id))"
+    )
+    legacy.execute("INSERT INTO front_matter (url, html, page) VALUES ('listing', '<html>legacy</html>', 1)")
+    legacy.commit()
+    legacy.close()
+
+    DB(fp=fp).create_tables()
+    (stored,) = sqlite3.connect(fp).execute("SELECT html FROM front_matter").fetchone()
+    assert isinstance(stored, bytes)
+    assert gzip.decompress(stored) == b"<html>legacy</html>"
+
+    DB(fp=fp).create_tables()
+    (again,) = sqlite3.connect(fp).execute("SELECT html FROM front_matter").fetchone()
+    assert again == stored
@@ -0,0 +1,80 @@
+import gzip
+from pathlib import Path
+
+import httpx
+from click.testing import CliRunner
+from pandas import DataFrame
+
+import src.main
+from src.db import DB
+
+
+def _db(tmp_path: Path) -> DB:
+    db = DB(fp=tmp_path / "jose.db")
+    db.create_tables()
+    return db
+
+
+def test_download_article_pages_skips_stored_urls(tmp_path: Path, monkeypatch) -> None:
+    db = _db(tmp_path)
+    db.insert_rows(table="front_matter", columns=("url", "html", "page"), rows=[("stored", b"html", 1)])
+    fetched: list[str] = []
+
+    async def fetch_article(client: httpx.AsyncClient, url: str, page: int) -> src.main.FetchResult:
+        fetched.append(url)
+        return url, b"html", page
+
+    monkeypatch.setattr(src.main, "fetch_article", fetch_article)
+
+    assert src.main.download_article_pages([("stored", 1), ("new", 2)], db) == 1
+    assert fetched == ["new"]
+    assert db.urls(table="front_matter") == {"stored", "new"}
+
+
+def test_main_only_extracts_articles_missing_from_metadata(tmp_path: Path, monkeypatch) -> None:
+    db = _db(tmp_path)
+    db.insert_rows(
+        table="front_matter",
+        columns=("url", "html", "page"),
+        rows=[("extracted", b"html", 1), ("pending", b"html", 1)],
+    )
+    db.insert_rows(
+        table="metadata",
+        columns=("url", "title", "publication_date", "authors", "status"),
+        rows=[("extracted", "Title", "", "", "")],
+    )
+    extracted_from: list[list[str]] = []
+
+    def extract_metadata(df: DataFrame) -> DataFrame:
+        extracted_from.append(df["url"].tolist())
+        return DataFrame()
+
+    monkeypatch.setattr(src.main, "download_listing_pages", lambda: DataFrame(columns=["url", "html", "page"]))
+    monkeypatch.setattr(src.main, "get_all_article_urls", lambda df: [("extracted", 1), ("pending", 1)])
+    monkeypatch.setattr(src.main, "download_article_pages", lambda urls, db: 0)
+    monkeypatch.setattr(src.main, "extract_metadata", extract_metadata)
+
+    result = CliRunner().invoke(src.main.main, ["--output", str(tmp_path / "jose.db")])
+
+    assert result.exit_code == 0, result.output
+    assert extracted_from == [["pending"]]
+
+
+LISTING = (Path(__file__).parent / "fixtures" / "listing.html").read_bytes()
+
+
+def test_get_all_article_urls_reads_paper_links_from_listing_pages() -> None:
+    listing_pages_df = DataFrame.from_records(
+        [
+            ("https://jose.theoj.org/papers?page=1", gzip.compress(LISTING), 1),
+            ("https://jose.theoj.org/papers?page=2", gzip.compress(LISTING), 2),
+        ],
+        columns=["url", "html", "page"],
+    )
+
+    assert src.main.get_all_article_urls(listing_pages_df) == [
+        ("https://jose.theoj.org/papers/10.21105/jose.00201", 1),
+        ("https://jose.theoj.org/papers/2a73fa24200e8c1ec47fc6e37f818a54", 1),
+        ("https://jose.theoj.org/papers/10.21105/jose.00201", 2),
+        ("https://jose.theoj.org/papers/2a73fa24200e8c1ec47fc6e37f818a54", 2),
+    ]
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+from src.main import _badge_status, extract_fast, parse_html
+
+FIXTURE = (Path(__file__).parent / "fixtures" / "paper.html").read_bytes()
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        FIXTURE,
+        FIXTURE.replace(
+            b'<span class="badge published">Published</span>',
+            b'<span class="label badge">Old</span><span class="badge badge-success">Published</span>',
+        ),
+        FIXTURE.replace(b'<span class="badge published">', b'<span id="status" class="badge published">'),
+        FIXTURE.replace(b'<span class="badge badge-lang">', b'<span class="label badge-lang">'),
+    ],
+)
+def test_fast_path_matches_parser(html: bytes) -> None:
+    metadata = extract_fast(html)
+    assert metadata is not None
+
+    metadata["status"] = _badge_status(html)
+    assert metadata == parse_html(html)
+
+
+def test_fast_path_defers_to_parser_without_citation_metas() -> None:
+    html = FIXTURE.replace(b'<meta name="citation_publication_date" content="2024/03/14">', b"")
+
+    assert extract_fast(html) is None
+    assert parse_html(html)["publication_date"] == "Accepted 14 March 2024"
+
+
+def test_date_meta_without_content_falls_back_to_time() -> None:
+    html = FIXTURE.replace(
+        b'<meta name="citation_publication_date" content="2024/03/14">',
+        b'<meta name="citation_publication_date">',
+    )
+
+    assert extract_fast(html) is None
+    assert parse_html(html)["publication_date"] == "Accepted 14 March 2024"
+
+
+def test_node_matching_several_selectors_feeds_each_fallback() -> None:
+    html = (
+        b"<html><head><title>Paper</title></head><body>"
+        b'<span class="badge time">Acc</span><h2 class="paper-title">Paper</h2>'
+        b"</body></html>"
+    )
+
+    metadata = parse_html(html)
+    assert metadata["publication_date"] == "Acc"
+    assert metadata["status"] == "acc"